@@ -2,21 +2,245 @@
 文档解析MCP工具
 支持PDF、Word、Excel、PPT等格式转换为Markdown
 """
+import asyncio
 import hashlib
+import json
+import logging
+import math
 import os
-import tempfile
+import threading
 import time
+from collections import OrderedDict
 from datetime import datetime
 from pathlib import Path
-from typing import Annotated, Dict
+from typing import Annotated, Dict, List, Optional, Tuple
 
-import requests
+import httpx
 from mcp.server import FastMCP
 from mcp.types import Field
 from tqdm import tqdm
 
+try:
+    import orjson
+except ImportError:  # orjson为可选依赖，未安装时使用标准库json
+    orjson = None
+
+# 日志输出到stderr（由FastMCP配置），stdio传输模式下stdout是MCP协议通道，不能直接打印
+logger = logging.getLogger(__name__)
+# httpx在INFO级别记录每个请求的完整URL，其中包含appId和鉴权字符串，只保留警告及以上级别
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+
+class LRUCache:
+    """线程安全的LRU缓存，支持按TTL过期
+
+    ttl为None时条目永不过期，ttl小于等于0时不缓存任何条目。
+    """
+
+    def __init__(self, maxsize: int = 128, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[object, Tuple[Optional[float], object]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """读取缓存，命中时刷新其LRU位置，过期条目直接淘汰"""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires_at, value = item
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        """写入缓存，超出容量时淘汰最久未使用的条目"""
+        if self.ttl is not None and self.ttl <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+
+class DocumentStore:
+    """基于本地磁盘的解析结果存储，以文件内容哈希为键，进程重启后依然有效
+
+    ttl的含义与LRUCache相同，小于等于0时不写入，已有的结果一律视为过期。
+    """
+
+    def __init__(self, cache_dir: str, ttl: Optional[float] = None):
+        self.cache_dir = Path(cache_dir)
+        self.ttl = ttl
+        self._lock = threading.RLock()
+
+    def _paths(self, key: str) -> Tuple[Path, Path]:
+        """返回正文文件和元数据文件的路径"""
+        return self.cache_dir / f"{key}.md", self.cache_dir / f"{key}.json"
+
+    @staticmethod
+    def _atomic_write(path: Path, text: str):
+        """先写临时文件再原子替换，避免其他线程或进程读到写了一半的文件
+
+        解析结果可能包含敏感内容，文件权限固定为仅当前用户可读写。
+        """
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with open(fd, 'w', encoding='utf-8') as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+        except OSError:
+            try:
+                tmp_path.unlink()
+            except FileNotFoundError:
+                pass
+            raise
+
+    def _is_expired(self, meta: Dict) -> bool:
+        if self.ttl is None:
+            return False
+        return self.ttl <= 0 or time.time() - meta.get("created_at", 0) > self.ttl
+
+    def get(self, key: str) -> Optional[Dict]:
+        """读取解析结果，不存在或已过期时返回None"""
+        text_path, meta_path = self._paths(key)
+        with self._lock:
+            try:
+                meta = json.loads(meta_path.read_text(encoding='utf-8'))
+                if self._is_expired(meta):
+                    self.delete(key)
+                    return None
+                text_content = text_path.read_text(encoding='utf-8')
+            except (OSError, ValueError):
+                return None
+        return {"text_content": text_content, "filename": meta.get("filename")}
+
+    def put(self, key: str, value: Dict):
+        """写入解析结果，元数据单独存放在JSON文件中
+
+        元数据文件最后写入，读取方只要能读到元数据，正文就已经完整落盘。
+        """
+        if self.ttl is not None and self.ttl <= 0:
+            return
+        text_path, meta_path = self._paths(key)
+        meta = {"filename": value.get("filename"), "created_at": time.time()}
+        with self._lock:
+            self.cache_dir.mkdir(mode=0o700, parents=True, exist_ok=True)
+            self._atomic_write(text_path, value["text_content"])
+            self._atomic_write(meta_path, json.dumps(meta, ensure_ascii=False))
+
+    def delete(self, key: str):
+        """删除解析结果"""
+        with self._lock:
+            for path in self._paths(key):
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+
+    def prune(self):
+        """清理所有已过期的解析结果"""
+        if self.ttl is None:
+            return
+        with self._lock:
+            for meta_path in self.cache_dir.glob("*.json"):
+                try:
+                    meta = json.loads(meta_path.read_text(encoding='utf-8'))
+                except (OSError, ValueError):
+                    meta = {}
+                if self._is_expired(meta):
+                    self.delete(meta_path.stem)
+
+
+def get_env_number(name: str, default, cast=int, minimum=None):
+    """读取数值型环境变量，值无效或小于下限时记录警告并使用默认值"""
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return default
+    try:
+        number = cast(value)
+    except ValueError:
+        number = None
+    if number is None or math.isnan(number) or (minimum is not None and number < minimum):
+        logger.warning("环境变量%s的值无效: %r，使用默认值%s", name, value, default)
+        return default
+    return number
+
+
 # 全局配置
-document_cache: Dict[str, Dict] = {}
+# 内存中缓存的解析结果条数上限和所有缓存的有效期（秒），可通过环境变量调整；
+# 有效期小于等于0时不缓存解析结果
+CACHE_MAX_SIZE = get_env_number("NIUTRANS_DOCUMENT_CACHE_SIZE", 32, minimum=0)
+CACHE_TTL = get_env_number("NIUTRANS_DOCUMENT_CACHE_TTL", 3600.0, cast=float)
+
+# 解析结果缓存：文件内容SHA-256 -> 解析结果，内容相同的文件共享同一份结果
+# 内存中只保留少量热点文档；设置了NIUTRANS_DOCUMENT_CACHE_DIR时，解析结果还会持久化到该目录
+document_cache = LRUCache(maxsize=CACHE_MAX_SIZE, ttl=CACHE_TTL)
+CACHE_DIR = os.getenv("NIUTRANS_DOCUMENT_CACHE_DIR")
+document_store = DocumentStore(CACHE_DIR, ttl=CACHE_TTL) if CACHE_DIR else None
+# 文件路径缓存：(绝对路径, 文件大小, 修改时间) -> 文件内容SHA-256，命中时无需重新计算哈希
+path_cache = LRUCache(maxsize=1024, ttl=CACHE_TTL)
+# 正在解析中的任务：文件内容SHA-256 -> 解析任务，相同内容的并发请求共享同一次API调用
+inflight_parses: Dict[str, "asyncio.Task[str]"] = {}
+
+# 支持的文件类型说明，内容固定，模块加载时构建一次
+SUPPORTED_FILE_TYPES = {
+    "supported_types": [
+        {"format": "PDF", "extensions": [".pdf"], "mime_type": "application/pdf"},
+        {"format": "Word", "extensions": [".doc", ".docx"],
+         "mime_type": ["application/msword",
+                       "application/vnd.openxmlformats-officedocument.wordprocessingml.document"]},
+        {"format": "Excel", "extensions": [".xls", ".xlsx"],
+         "mime_type": ["application/vnd.ms-excel",
+                       "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"]},
+        {"format": "PPT", "extensions": [".ppt", ".pptx"],
+         "mime_type": ["application/vnd.ms-powerpoint",
+                       "application/vnd.openxmlformats-officedocument.presentationml.presentation"]}
+    ],
+    "description": "支持解析文档并返回提取的Markdown格式内容"
+}
+
+# 支持的文件后缀（不带点），由上面的类型说明派生，保证两处始终一致
+_SUPPORTED_SUFFIX_LIST = [
+    extension.lstrip('.')
+    for file_type in SUPPORTED_FILE_TYPES["supported_types"]
+    for extension in file_type["extensions"]
+]
+SUPPORTED_SUFFIXES = frozenset(_SUPPORTED_SUFFIX_LIST)
+UNSUPPORTED_TYPE_MESSAGE = f"不支持的文件类型。请上传以下格式的文件: {', '.join(_SUPPORTED_SUFFIX_LIST)}"
+
+# 预处理时需要去除的乱码：转义形式的\u0000、NUL字符和替换字符�
+NOISE_STRINGS = ("\\u0000", "\x00", "\ufffd")
+
+# 共享的异步HTTP客户端，在多次解析之间复用TCP/TLS连接；
+# 使用默认传输层，以便沿用HTTP_PROXY/HTTPS_PROXY等环境变量中的代理配置
+http_client = httpx.AsyncClient(
+    limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+    timeout=60,
+    # 与requests保持一致，下载接口可能重定向到CDN
+    follow_redirects=True
+)
+# 限制同时进行的解析任务数（上传、轮询、下载全过程），可通过环境变量调整
+ocr_semaphore = asyncio.Semaphore(get_env_number("NIUTRANS_DOCUMENT_MAX_CONCURRENCY", 3, minimum=1))
+# 下载进度条的最短刷新间隔（秒），期间收到的字节数累积后一次性更新
+PROGRESS_UPDATE_INTERVAL = 0.1
+# 按Content-Length预分配下载缓冲区的上限，超出部分随数据到达再扩展
+MAX_PREALLOCATE_SIZE = 64 * 1024 * 1024
 
 # 创建MCP服务器实例
 mcp = FastMCP("NiuTrans_Document_Parse")
@@ -28,20 +252,52 @@ class UploadFileWrapper:
     def __init__(self, file_path: str):
         self.file_path = file_path
         self.filename = os.path.basename(file_path)
-        self.file = open(file_path, 'rb')
+        # 使用1MB读缓冲，减少分块上传时的read系统调用次数
+        self.file = open(file_path, 'rb', buffering=1024 * 1024)
 
     def close(self):
         """关闭文件"""
         if hasattr(self, 'file') and not self.file.closed:
             self.file.close()
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class DocumentTransError(Exception):
+    """文档转换API调用失败"""
+
+
+def parse_json_response(resp: httpx.Response):
+    """解析API响应中的JSON，安装了orjson时直接从字节解析，省去解码步骤"""
+    if orjson is not None:
+        return orjson.loads(resp.content)
+    return json.loads(resp.content)
+
+
+async def retry_on_transient_error(func, *args, retries=3, backoff=0.5, **kwargs):
+    """对连接失败、连接被中断等临时错误按指数退避重试，只适用于幂等请求
+
+    超时说明服务端繁忙，不在这里重试。
+    """
+    for attempt in range(retries + 1):
+        try:
+            return await func(*args, **kwargs)
+        except (httpx.ConnectError, httpx.ReadError, httpx.RemoteProtocolError):
+            if attempt >= retries:
+                raise
+            await asyncio.sleep(backoff * 2 ** attempt)
+
 
 class DocumentTransClient:
     """文档转换API客户端（使用小牛翻译API）"""
 
-    def __init__(self, base_url="https://api.niutrans.com", app_id="", apikey=""):
+    def __init__(self, base_url="https://api.niutrans.com", app_id="", apikey="", client=None):
         self.base_url = base_url.rstrip('/')
-        self.session = requests.Session()
+        self.client = client or http_client
         self.app_id = app_id
         self.apikey = apikey
 
@@ -60,7 +316,7 @@ class DocumentTransClient:
         auth_str = md5.hexdigest()
         return auth_str
 
-    def upload_and_convert(self, file, to_file_suffix="markdown", processing_mode=0, from_lang=None):
+    async def upload_and_convert(self, file, to_file_suffix="markdown", processing_mode=0, from_lang=None):
         """上传文件并转换"""
         files = {'file': file}
         data = {
@@ -75,46 +331,39 @@ class DocumentTransClient:
         data['authStr'] = auth_str
 
         try:
-            resp = self.session.post(self.convert_url, files=files, data=data)
-            resp_json = resp.json()
+            resp = await self.client.post(self.convert_url, files=files, data=data)
+            resp_json = parse_json_response(resp)
 
-            print(f"文档转换API上传返回值: {resp_json}")
+            logger.debug("文档转换API上传返回值: %s", resp_json)
 
             # 检查HTTP状态码
             if resp.status_code != 200:
                 error_msg = resp_json.get('msg', f"API返回错误状态码: {resp.status_code}")
-                raise Exception(f"文件上传失败: {error_msg}")
+                raise DocumentTransError(f"文件上传失败: {error_msg}")
 
             # 检查业务逻辑错误
             code = resp_json.get('code', 500)
             if code != 200:
                 error_msg = resp_json.get('msg', '未知错误')
-                raise Exception(f"文件上传失败: {error_msg}")
+                raise DocumentTransError(f"文件上传失败: {error_msg}")
 
             # 检查data是否存在
             if 'data' not in resp_json or resp_json['data'] is None:
-                raise Exception("文件上传失败: API返回数据为空")
+                raise DocumentTransError("文件上传失败: API返回数据为空")
 
             # 获取fileNo
             file_no = resp_json['data'].get('fileNo')
             if not file_no:
-                raise Exception("文件上传失败: 未返回有效的fileNo")
+                raise DocumentTransError("文件上传失败: 未返回有效的fileNo")
 
             return file_no
 
-        except Exception as e:
-            # 如果是已捕获的异常，直接重新抛出
-            if isinstance(e, Exception) and "文件上传失败" in str(e):
-                raise
-
-            # 处理其他异常
+        except (httpx.HTTPError, ValueError) as e:
+            # 处理网络错误和响应解析错误，业务错误已在上面以DocumentTransError抛出
             error_msg = f"文件上传失败: {str(e)}"
-            # 尝试从响应中获取更多错误信息
-            if 'resp_json' in locals():
-                error_msg += f"，API响应: {resp_json}"
-            raise Exception(error_msg)
+            raise DocumentTransError(error_msg) from e
 
-    def get_document_info(self, file_no):
+    async def get_document_info(self, file_no):
         """获取文档信息"""
         params = {
             "appId": self.app_id,
@@ -129,41 +378,34 @@ class DocumentTransClient:
         url = self.status_url.format(file_no=file_no)
 
         try:
-            resp = self.session.get(url, params=params)
-            resp_json = resp.json()
+            resp = await retry_on_transient_error(self.client.get, url, params=params)
+            resp_json = parse_json_response(resp)
 
-            print(f"获取文档信息返回值: {resp_json}")
+            logger.debug("获取文档信息返回值: %s", resp_json)
 
             # 检查HTTP状态码
             if resp.status_code != 200:
                 error_msg = resp_json.get('msg', f"API返回错误状态码: {resp.status_code}")
-                raise Exception(f"获取文档信息失败: {error_msg}")
+                raise DocumentTransError(f"获取文档信息失败: {error_msg}")
 
             # 检查业务逻辑错误
             code = resp_json.get('code', 500)
             if code != 200:
                 error_msg = resp_json.get('msg', '未知错误')
-                raise Exception(f"获取文档信息失败: {error_msg}")
+                raise DocumentTransError(f"获取文档信息失败: {error_msg}")
 
             # 检查data是否存在
             if 'data' not in resp_json or resp_json['data'] is None:
-                raise Exception("获取文档信息失败: API返回数据为空")
+                raise DocumentTransError("获取文档信息失败: API返回数据为空")
 
             return resp_json['data']
 
-        except Exception as e:
-            # 如果是已捕获的异常，直接重新抛出
-            if isinstance(e, Exception) and "获取文档信息失败" in str(e):
-                raise
-
-            # 处理其他异常
+        except (httpx.HTTPError, ValueError) as e:
+            # 处理网络错误和响应解析错误，业务错误已在上面以DocumentTransError抛出
             error_msg = f"获取文档信息失败: {str(e)}"
-            # 尝试从响应中获取更多错误信息
-            if 'resp_json' in locals():
-                error_msg += f"，API响应: {resp_json}"
-            raise Exception(error_msg)
+            raise DocumentTransError(error_msg) from e
 
-    def interrupt_convert(self, file_no):
+    async def interrupt_convert(self, file_no):
         """中断转换"""
         data = {
             "appId": self.app_id,
@@ -178,38 +420,31 @@ class DocumentTransClient:
         url = self.interrupt_url.format(file_no=file_no)
 
         try:
-            resp = self.session.put(url, data=data)
-            resp_json = resp.json()
+            resp = await self.client.put(url, data=data)
+            resp_json = parse_json_response(resp)
 
-            print(f"中断转换返回值: {resp_json}")
+            logger.debug("中断转换返回值: %s", resp_json)
 
             # 检查HTTP状态码
             if resp.status_code != 200:
                 error_msg = resp_json.get('msg', f"API返回错误状态码: {resp.status_code}")
-                raise Exception(f"中断转换失败: {error_msg}")
+                raise DocumentTransError(f"中断转换失败: {error_msg}")
 
             # 检查业务逻辑错误
             code = resp_json.get('code', 500)
             if code != 200:
                 error_msg = resp_json.get('msg', '未知错误')
-                raise Exception(f"中断转换失败: {error_msg}")
+                raise DocumentTransError(f"中断转换失败: {error_msg}")
 
             return True
 
-        except Exception as e:
-            # 如果是已捕获的异常，直接重新抛出
-            if isinstance(e, Exception) and "中断转换失败" in str(e):
-                raise
-
-            # 处理其他异常
+        except (httpx.HTTPError, ValueError) as e:
+            # 处理网络错误和响应解析错误，业务错误已在上面以DocumentTransError抛出
             error_msg = f"中断转换失败: {str(e)}"
-            # 尝试从响应中获取更多错误信息
-            if 'resp_json' in locals():
-                error_msg += f"，API响应: {resp_json}"
-            raise Exception(error_msg)
+            raise DocumentTransError(error_msg) from e
 
-    def download_file(self, file_no, save_path):
-        """下载文件"""
+    async def download_content(self, file_no) -> bytearray:
+        """下载文件内容到内存，不落盘"""
         params = {
             "type": 1,
             "appId": self.app_id,
@@ -224,47 +459,67 @@ class DocumentTransClient:
         url = self.download_url.format(file_no=file_no)
 
         try:
-            with self.session.get(url, params=params, stream=True) as resp:
-                total_size = int(resp.headers.get('content-length', 0))
-
-                # 获取文件名（如果响应头中有）
-                file_name = None
-                content_disposition = resp.headers.get('Content-Disposition')
-                if content_disposition:
+            async with self.client.stream('GET', url, params=params) as resp:
+                # 检查HTTP状态码，错误响应体不能当作解析结果返回或缓存
+                if resp.status_code != 200:
+                    await resp.aread()
                     try:
-                        file_name = content_disposition.split('=')[1]
-                        # 移除可能的引号
-                        if file_name.startswith('"') and file_name.endswith('"'):
-                            file_name = file_name[1:-1]
-                    except:
-                        pass
-
-                # 如果没有从响应头获取到文件名，使用默认名称
-                if not file_name:
-                    file_name = f"parsed_{file_no}.md"
-                    save_path = os.path.join(os.path.dirname(save_path), file_name)
-
-                with open(save_path, 'wb') as f, tqdm(
+                        error_msg = parse_json_response(resp).get('msg')
+                    except (ValueError, AttributeError):
+                        error_msg = None
+                    raise DocumentTransError(
+                        f"文件下载失败: {error_msg or f'API返回错误状态码: {resp.status_code}'}"
+                    )
+
+                try:
+                    total_size = max(int(resp.headers.get('content-length', 0)), 0)
+                except ValueError:
+                    total_size = 0
+                # 按响应长度一次性分配缓冲区，各块直接复制到对应位置，
+                # 避免先缓存所有块再拼接造成的双倍内存占用；
+                # 长度未知、超过预分配上限或响应经过压缩时，切片赋值会自动扩展缓冲区
+                buffer = bytearray(min(total_size, MAX_PREALLOCATE_SIZE))
+                offset = 0
+
+                with tqdm(
                         desc="下载解析结果",
                         total=total_size,
                         unit='B',
                         unit_scale=True,
                         unit_divisor=1024
                 ) as bar:
-                    for chunk in resp.iter_content(chunk_size=8192):
-                        f.write(chunk)
-                        bar.update(len(chunk))
-            return save_path
-        except Exception as e:
-            raise Exception(f"文件下载失败: {str(e)}")
-
-    def wait_for_completion(self, file_no, interval=1, timeout=3600) -> dict:
-        """等待转换完成"""
+                    reported = 0
+                    last_update = time.monotonic()
+                    # 数据直接复制进缓冲区，无需httpx按固定大小重新分块（重新分块会多一次拷贝）
+                    async for chunk in resp.aiter_bytes():
+                        buffer[offset:offset + len(chunk)] = chunk
+                        offset += len(chunk)
+                        now = time.monotonic()
+                        if now - last_update >= PROGRESS_UPDATE_INTERVAL:
+                            bar.update(offset - reported)
+                            reported = offset
+                            last_update = now
+                    bar.update(offset - reported)
+                del buffer[offset:]
+            return buffer
+        except (httpx.HTTPError, OSError) as e:
+            raise DocumentTransError(f"文件下载失败: {str(e)}") from e
+
+    async def wait_for_completion(self, file_no, min_interval=0.3, max_interval=3.0, backoff=1.5,
+                                  timeout=3600) -> dict:
+        """等待转换完成
+
+        查询间隔从min_interval开始按backoff倍数递增，最长不超过max_interval，
+        短任务能尽快返回，长任务也不会产生大量无用的状态查询。
+        如果API在状态数据中给出了retryAfter（秒），则以其作为下次查询的间隔，
+        该间隔只受min_interval下限约束，max_interval仅用于客户端自身的退避。
+        """
         start_time = time.time()
         last_progress = 0
+        delay = min_interval
         with tqdm(desc="文档解析进度", unit="%") as pbar:
             while True:
-                status_data = self.get_document_info(file_no)
+                status_data = await self.get_document_info(file_no)
 
                 # 获取状态和进度信息
                 convertStatus = status_data.get('convertStatus', 200)
@@ -287,17 +542,21 @@ class DocumentTransClient:
                     return status_data
                 elif convertStatus == 204:  # 处理失败
                     error_msg = status_data.get('errorMsg', '处理失败')
-                    raise Exception(f"解析失败: {error_msg}")
+                    raise DocumentTransError(f"解析失败: {error_msg}")
                 elif convertStatus == 106:  # 已取消
-                    raise Exception("解析任务已取消")
+                    raise DocumentTransError("解析任务已取消")
                 elif time.time() - start_time > timeout:
                     raise TimeoutError(f"解析超时（{timeout}秒）")
 
-                time.sleep(interval)
+                retry_after = status_data.get('retryAfter')
+                if isinstance(retry_after, (int, float)) and retry_after > 0:
+                    delay = max(retry_after, min_interval)
+                await asyncio.sleep(delay)
+                delay = min(delay * backoff, max_interval)
 
 
 
-def call_document_convert_api(file) -> str:
+async def call_document_convert_api(file_path: str) -> str:
     """调用文档转换API获取解析后的文本（主要是Markdown）"""
     api_key = os.getenv("NIUTRANS_API_KEY")
     app_id = os.getenv("NIUTRANS_DOCUMENT_APPID")
@@ -308,38 +567,81 @@ def call_document_convert_api(file) -> str:
         apikey=api_key  # 在'控制台->个人中心'中查看
     )
     try:
-        # 上传并转换文件
-        file_no = client.upload_and_convert(
-            file=file.file,
-            from_lang="auto"  # 设置源语言
-        )
-        print(f"文档解析任务提交成功，file_no: {file_no}")
+        # 上传并转换文件，上传完成后立即关闭文件，等待解析期间不占用文件句柄
+        with UploadFileWrapper(file_path) as file:
+            file_no = await client.upload_and_convert(
+                file=file.file,
+                from_lang="auto"  # 设置源语言
+            )
+        logger.info("文档解析任务提交成功，file_no: %s", file_no)
         
         # 等待转换完成
-        status_data = client.wait_for_completion(file_no)
+        status_data = await client.wait_for_completion(file_no)
         
-        # 下载转换后的MD文件并直接读取内容
-        with tempfile.TemporaryDirectory() as temp_dir:
-            downloaded_file_path = os.path.join(temp_dir, f"parsed_{file_no}.md")
-            client.download_file(file_no, downloaded_file_path)
-            # 直接读取MD文件内容
-            with open(downloaded_file_path, 'r', encoding='utf-8') as f:
-                text_content = f.read()
+        # 将转换后的MD文件直接下载到内存并解码
+        content = await client.download_content(file_no)
+        text_content = content.decode('utf-8')
         
         return text_content
+    except DocumentTransError:
+        # API客户端抛出的错误已带有具体原因，直接向上传递，避免重复包装
+        raise
     except Exception as e:
-        raise Exception(
+        raise DocumentTransError(
             f"解析失败：可能是文件格式错误或API连接问题。"
             f"原始错误：{str(e)}"
-        )
+        ) from e
+
+
+def get_file_cache_key(file_path: str) -> Tuple[str, int, int]:
+    """根据路径、大小和修改时间生成文件缓存键，文件被修改后缓存自动失效"""
+    stat = os.stat(file_path)
+    return os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns
+
+
+def compute_file_sha256(file_path: str) -> str:
+    """分块计算文件内容的SHA-256，作为解析结果的内容寻址键"""
+    with open(file_path, 'rb') as f:
+        # Python 3.11+ 的file_digest复用同一块缓冲区读取文件，无需为每个数据块分配新对象
+        if hasattr(hashlib, 'file_digest'):
+            return hashlib.file_digest(f, 'sha256').hexdigest()
+        sha256 = hashlib.sha256()
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            sha256.update(block)
+        return sha256.hexdigest()
+
+
+def get_cached_result(content_hash: str) -> Optional[Dict]:
+    """依次从内存缓存和磁盘存储中读取解析结果"""
+    result = document_cache.get(content_hash)
+    if result is None and document_store is not None:
+        result = document_store.get(content_hash)
+        if result is not None:
+            document_cache.set(content_hash, result)
+    return result
+
+
+def store_cached_result(content_hash: str, result: Dict):
+    """将解析结果同时写入内存缓存和磁盘存储"""
+    document_cache.set(content_hash, result)
+    if document_store is None:
+        return
+    try:
+        document_store.put(content_hash, result)
+    except OSError:
+        # 磁盘存储只是加速手段，写入失败不影响本次解析结果
+        pass
 
 
 def preprocess_raw_text(raw_text: str) -> str:
     """简单预处理Markdown文本（去除乱码和多余空行）"""
-    lines = [line.strip() for line in raw_text.splitlines() if line.strip()]
-    cleaned_text = "\n".join(lines)
-    cleaned_text = cleaned_text.replace("\\u0000", "").replace("�", "").replace("\r", "")
-    return cleaned_text
+    # 先去除乱码：子串查找在C层完成，只有文本中确实存在乱码时才执行替换
+    cleaned_text = raw_text
+    for noise in NOISE_STRINGS:
+        if noise in cleaned_text:
+            cleaned_text = cleaned_text.replace(noise, "")
+    # 再按行去除首尾空白并丢弃空行（splitlines已处理\r）
+    return "\n".join(filter(None, map(str.strip, cleaned_text.splitlines())))
 
 
 def process_document_content(text_content: str) -> str:
@@ -351,6 +653,28 @@ def process_document_content(text_content: str) -> str:
         raise Exception(f"文档处理失败: {str(e)}")
 
 
+async def convert_and_cache_document(
+        file_path: str, content_hash: str, filename: str, use_cache: bool = True
+) -> str:
+    """调用文档解析API解析文件，处理文本后写入缓存（use_cache为False时不写入）"""
+    # 限制同时进行的解析任务数，等待期间不阻塞事件循环；
+    # 等到获得执行名额后再打开文件，排队中的任务不占用文件句柄
+    async with ocr_semaphore:
+        text_content = await call_document_convert_api(file_path)
+
+    # 处理文本内容
+    process_result = process_document_content(text_content)
+
+    if not use_cache:
+        return process_result
+    await asyncio.to_thread(
+        store_cached_result,
+        content_hash,
+        {"text_content": process_result, "filename": filename}
+    )
+    return process_result
+
+
 @mcp.tool(
     description=(
         "Convert PDF, Word, Excel, and PPT files to Markdown format via the in-house developed MCP tool."
@@ -358,21 +682,29 @@ def process_document_content(text_content: str) -> str:
         "The file_path (file path) parameter must be filled in with the absolute path of the file, not a relative path."
         "Use NiuTrans Document Api"
     ))
-def parse_document_by_path(
+async def parse_document_by_path(
         file_path: Annotated[
             str,
             Field(
                 description="文件地址，支持pdf、doc、docx、xls、xlsx、ppt、pptx格式"
             ),
-        ]
+        ],
+        disable_cache: Annotated[
+            bool,
+            Field(
+                description="是否跳过解析结果缓存，强制重新调用文档解析API且不缓存本次结果"
+            ),
+        ] = False
 ) -> Dict[str, str]:
     """
     使用小牛文档翻译api将文件转换为Markdown格式。
 
     处理完成后，会返回成功的Markdown格式文本内容。
+    同一文件（或内容相同的文件）的解析结果会被缓存，重复解析时直接返回缓存结果。
 
     Args:
         file_path: 文件地址,绝对路径
+        disable_cache: 是否跳过缓存
 
     返回:
         成功: {"status": "success", "text_content": "文件内容", "filename": 文件名}
@@ -382,28 +714,44 @@ def parse_document_by_path(
         if not file_path:
             return {"status": "error", "error": "未提供有效的文件内容或文件名"}
 
-        # 检查文件类型
-        file_suffix = Path(file_path).suffix.lower()
-        # 同时支持带点和不带点的后缀格式
-        supported_suffixes = [".pdf", ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx"]
-        supported_types = ["pdf", "doc", "docx", "xls", "xlsx", "ppt", "pptx"]
-
-        # 获取不带点的后缀（如果有）
-        simple_suffix = file_suffix.lstrip('.')
-
-        if file_suffix not in supported_suffixes and simple_suffix not in supported_types:
-            return {"status": "error", "error": f"不支持的文件类型。请上传以下格式的文件: {', '.join(supported_types)}"}
+        # 检查文件类型，统一使用不带点的后缀进行比较
+        file_suffix = os.path.splitext(file_path)[1][1:].lower()
+        if file_suffix not in SUPPORTED_SUFFIXES:
+            return {"status": "error", "error": UNSUPPORTED_TYPE_MESSAGE}
 
         try:
-            # 处理文档
-            # 创建模拟的UploadFile对象
-            fake_file = UploadFileWrapper(file_path)
-            filename = fake_file.filename
-            
-            text_content = call_document_convert_api(fake_file)
-            
-            # 处理文本内容
-            process_result = process_document_content(text_content)
+            filename = os.path.basename(file_path)
+
+            # 先按路径查找缓存，未命中时再按文件内容哈希查找
+            file_key = get_file_cache_key(file_path)
+            content_hash = path_cache.get(file_key)
+            if content_hash is None:
+                content_hash = await asyncio.to_thread(compute_file_sha256, file_path)
+                path_cache.set(file_key, content_hash)
+
+            if not disable_cache:
+                cached_result = await asyncio.to_thread(get_cached_result, content_hash)
+                if cached_result is not None:
+                    return {
+                        "text_content": cached_result["text_content"],
+                        "filename": filename,
+                        "status": "success"
+                    }
+
+            if disable_cache:
+                # 跳过缓存时必须重新调用API，既不复用也不登记正在进行的解析任务
+                process_result = await convert_and_cache_document(
+                    file_path, content_hash, filename, use_cache=False
+                )
+            else:
+                # 相同内容的文件正在解析时直接等待其结果，不重复上传；
+                # shield保证某个调用方被取消时，其他等待同一任务的调用方不受影响
+                task = inflight_parses.get(content_hash)
+                if task is None:
+                    task = asyncio.ensure_future(convert_and_cache_document(file_path, content_hash, filename))
+                    inflight_parses[content_hash] = task
+                    task.add_done_callback(lambda _: inflight_parses.pop(content_hash, None))
+                process_result = await asyncio.shield(task)
 
             return {
                 "text_content": process_result,
@@ -416,33 +764,63 @@ def parse_document_by_path(
         return {"status": "error", "error": f"解析失败：{str(e)}"}
 
 
+@mcp.tool(
+    description=(
+        "Convert multiple PDF, Word, Excel, and PPT files to Markdown format in one call via the in-house developed MCP tool."
+        "Files are parsed concurrently, which is much faster than calling parse_document_by_path for each file."
+        "Every item of file_paths must be the absolute path of a file, not a relative path."
+        "Use NiuTrans Document Api"
+    ))
+async def parse_documents_by_path(
+        file_paths: Annotated[
+            List[str],
+            Field(
+                description="文件地址列表，支持pdf、doc、docx、xls、xlsx、ppt、pptx格式"
+            ),
+        ],
+        disable_cache: Annotated[
+            bool,
+            Field(
+                description="是否跳过解析结果缓存，强制重新调用文档解析API且不缓存本次结果"
+            ),
+        ] = False
+) -> List[Dict[str, str]]:
+    """
+    使用小牛文档翻译api批量将文件转换为Markdown格式。
+
+    各文件并发解析，同时进行的解析任务数受全局并发上限约束。
+
+    Args:
+        file_paths: 文件地址列表,绝对路径
+        disable_cache: 是否跳过缓存
+
+    返回:
+        与file_paths顺序一致的结果列表，每项格式与parse_document_by_path的返回值相同
+    """
+    return list(await asyncio.gather(
+        *(parse_document_by_path(file_path, disable_cache=disable_cache) for file_path in file_paths)
+    ))
+
+
 @mcp.resource("document://supported-types")
 def get_supported_file_types() -> Dict[str, list]:
-    return {
-        "supported_types": [
-            {"format": "PDF", "extensions": [".pdf"], "mime_type": "application/pdf"},
-            {"format": "Word", "extensions": [".doc", ".docx"],
-             "mime_type": ["application/msword",
-                           "application/vnd.openxmlformats-officedocument.wordprocessingml.document"]},
-            {"format": "Excel", "extensions": [".xls", ".xlsx"],
-             "mime_type": ["application/vnd.ms-excel",
-                           "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"]},
-            {"format": "PPT", "extensions": [".ppt", ".pptx"],
-             "mime_type": ["application/vnd.ms-powerpoint",
-                           "application/vnd.openxmlformats-officedocument.presentationml.presentation"]}
-        ],
-        "description": "支持解析文档并返回提取的Markdown格式内容"
-    }
+    return SUPPORTED_FILE_TYPES
 
 
 def main():
     """MCP工具主入口点"""
+    # 启动时清理磁盘上已过期的解析结果
+    if document_store is not None:
+        try:
+            document_store.prune()
+        except OSError:
+            pass
     # 直接启动MCP服务器，使用默认配置
     mcp.run(transport="stdio")
 
 
 # 确保MCP实例被正确导出，便于被其他模块导入和使用
-__all__ = ['mcp', 'parse_document_by_path', 'get_supported_file_types', 'main']
+__all__ = ['mcp', 'parse_document_by_path', 'parse_documents_by_path', 'get_supported_file_types', 'main']
 
 
 if __name__ == '__main__':